@@ -10,34 +10,88 @@
 
 from energyDep import *
 import scipy.integrate
+import scipy.optimize
+from numba import njit, prange
 
-def RadLowlim(theta):
-    """ TRad in m, totdepth is in cm"""
-    return TRad - totdepth/100.0
+def make_cubature_integrand(edep, totdepth, Flx_min):
+    """
+    Build the vectorized integrand for scipy.integrate.cubature around a
+    deposition function specialized to the run's material.  The radial
+    variable is mapped to s in [0, 1] through r = TRad - s*totdepth/100,
+    so the integration region is the axis-aligned rectangle
+    [0, 1] x [0, theta_max] and the Jacobian totdepth/100 is folded into
+    the integrand.  Flx_min (kt/m^2) bounds the fluence below which the
+    deposition is under 1e-80; those nodes return zero without touching
+    the fit stack.  edep(z, beta, Flx, Tsrc, Porosity) is a scalar
+    compiled deposition function; the whole batch of cubature points runs
+    through it in one compiled parallel loop.
+    Returns f(points) for points of shape (npoints, 2) with columns
+    (s, theta), giving energy per unit (s, theta) in Perg.
+    """
+    @njit(parallel=True, fastmath=True)
+    def Edep_points(s_arr, theta_arr, Yield, Tsrc, Porosity, TRad, HOB):
+        jac = totdepth/100.0  # |dr/ds| in m
+        out = np.empty(s_arr.shape[0])
+        for i in prange(s_arr.shape[0]):
+            theta  = theta_arr[i]
+            radius = TRad - s_arr[i]*jac  # in m
+            length = math.sqrt((TRad+HOB)**2 + TRad**2 - 2.*(TRad+HOB)*TRad*math.cos(theta)) # in m
+            sn     = math.sin(theta)*(HOB+TRad)/length
+            beta   = math.sqrt(max(0.0, 1.0 - sn*sn)) # cos(asin(sn)) without the trig calls
+            Flx    = Yield*beta/(4*math.pi*(length**2)) # kt/m^2
+            if Flx < Flx_min:
+                out[i] = 0.0
+                continue
+            dE     = edep(s_arr[i]*totdepth, beta, Flx, Tsrc, Porosity) # Perg/cm^3
+            # dE*1e6 gives Perg/m^3 to match the r integral in m; jac is dr/ds
+            out[i] = dE*1e6*2.*math.pi*radius**2 * math.sin(theta)*jac
+        return out
 
-def RadUplim(theta):
-    """ TRad in m"""
-    return TRad
+    def integrand(points):
+        s_arr     = np.ascontiguousarray(points[:, 0])
+        theta_arr = np.ascontiguousarray(points[:, 1])
+        return Edep_points(s_arr, theta_arr, Yield, Tsrc, Porosity, TRad, HOB)
+    return integrand
 
-def EdepfuncIntegrand(radius, theta, Material, BB, Yield, Tsrc, Porosity, TRad, HOB):
+def make_sweep(edep_zbatch):
     """
-    radius in m
-    theta in radians
-    Material in ["SiO2", "Forsterite","Iron", "Ice"]
-    BB in [1.0, 2.0]
-    Yield in kt
-    Tsrc in ns
-    Porosity - dimensionless, in range (0, 1.0)
-    TRad in m
-    HOB in m
-    returns energy in Perg/m, assuming integral over r in meters
+    Build the zone-centered angular sweep around a specialized batch
+    deposition function.  The angles are independent, so the sweep runs as
+    a parallel reduction across threads.  The returned function gives
+    (Esum, nshallow); nshallow counts angles whose deposition never fell
+    below 1e-10, i.e. where totdepth was not deep enough.
     """
-    d      = TRad - radius  # in m
-    length = math.sqrt((TRad+HOB)**2 + TRad**2 - 2.*(TRad+HOB)*TRad*math.cos(theta)) # in m
-    beta   = math.cos(math.asin(math.sin(theta)*(HOB+TRad)/length))
-    Flx    = Yield*beta/(4*math.pi*(length**2)) # kt/m^2
-    dE     = Edepfunc(d*100.0, Material, BB, beta, Flx, Tsrc, Porosity) # Perg/cm^3
-    return dE*1e6*2.*math.pi*radius**2 * math.sin(theta) # dE*1e6 gives Perg/m^3 to match integral in m
+    @njit(parallel=True)
+    def EdepSweep(d_arr, vol_arr, AngRes, theta_max, Yield, Tsrc, Porosity, TRad, HOB):
+        Esum = 0.0
+        nshallow = 0
+        for it in prange(AngRes//2):
+            t = 2*it + 1
+            theta=theta_max*t/AngRes
+            theta0=theta_max*(t-1)/AngRes
+            theta1=theta_max*(t+1)/AngRes
+            length=math.sqrt((TRad+HOB)**2+TRad**2-2.*(TRad+HOB)*TRad*math.cos(theta))
+            length0=math.sqrt((TRad+HOB)**2+TRad**2-2.*(TRad+HOB)*TRad*math.cos(theta0))
+            length1=math.sqrt((TRad+HOB)**2+TRad**2-2.*(TRad+HOB)*TRad*math.cos(theta1))
+            s=math.sin(theta)*(HOB+TRad)/length
+            beta=math.sqrt(max(0.0,1.0-s*s)) # cos(asin(s)) without the trig calls
+            textra=abs(length1-length0)/2.99792458e2
+            Flx=Yield*beta/(4*math.pi*(length**2))
+            dE=edep_zbatch(d_arr, beta, Flx, Tsrc+textra, Porosity)
+            cut = -1
+            for i in range(dE.shape[0]):
+                if dE[i] < 1.e-10:   # first depth below threshold, where the old loop broke
+                    cut = i
+                    break
+            if cut < 0:
+                nshallow += 1
+                cut = dE.shape[0]
+            part = 0.0
+            for i in range(cut):
+                part += dE[i]*vol_arr[i]
+            Esum += part*(math.cos(theta0)-math.cos(theta1))
+        return Esum, nshallow
+    return EdepSweep
 
 Materials = ['SiO2','Forsterite','Ice','Iron']
 BB    = 2.0
@@ -48,52 +102,121 @@ Yield = 1000.0 # in kt
 Porosity = 0.21 # 0.32
 AngRes = 200
 Depthres = 5.e-5 # in cm
-totdepth = 10.0 # in cm 
+totdepth = 10.0 # in cm
+UseTable = True # integrate from a tabulated deposition instead of the full fit stack
 theta_max = math.acos(TRad/(TRad + HOB))# math.acos(5500./(5501.)) #math.acos(TRad/(TRad + HOB))
 alpha_max = math.asin(TRad/(TRad + HOB))
-Esum=0.0
+# one material/BB pair is live for the whole run; bake its coefficients in
+# as compile-time constants and build the compiled drivers around them
+edepM, edepM_z = make_edepfunc(Materials[0], BB)
+EdepSweep = make_sweep(edepM_z)
 print("Energy intercepted by asteroid ", Yield*0.5*(1. - math.cos(alpha_max)))
 
 # Find depth of deposition on axis
 # This helps the integration routine find where the integrand is non-zero
 beta = 1.0
 Flx  = Yield/(4*math.pi*(HOB**2)) # kt/m^2
-dE   = 1.0
-d    = Depthres
-while dE > 1.e-80:
-    dlast = d
-    d = 1.5*d
-    dE=Edepfunc(d, Materials[0], BB, beta, Flx, Tsrc, Porosity)
-totdepth = d
-
-print("Starting integral, this may be slow, be patient.")
-EsumInt = scipy.integrate.dblquad(EdepfuncIntegrand, 0., theta_max, RadLowlim, RadUplim, args=(Materials[0], BB, Yield, Tsrc, Porosity, TRad, HOB))
-print("Integrated deposited energy:    ", EsumInt[0]/4.184e4, "kt  +- ", EsumInt[1]/4.184e4, " kt")
-
-for t in range(1,AngRes,2):
-    #if t % 5 ==0:
-    #    print(t)
-    depflag=1
-    theta=theta_max*t/AngRes
-    theta0=theta_max*(t-1)/AngRes
-    theta1=theta_max*(t+1)/AngRes
-    length=math.sqrt((TRad+HOB)**2+TRad**2-2.*(TRad+HOB)*TRad*math.cos(theta))
-    length0=math.sqrt((TRad+HOB)**2+TRad**2-2.*(TRad+HOB)*TRad*math.cos(theta0))
-    length1=math.sqrt((TRad+HOB)**2+TRad**2-2.*(TRad+HOB)*TRad*math.cos(theta1))
-    beta=math.cos(math.asin(math.sin(theta)*(HOB+TRad)/length))
-    textra=abs(length1-length0)/2.99792458e2
-    Flx=Yield*beta/(4*math.pi*(length**2))
-    for d in np.arange(Depthres,totdepth,2.0*Depthres):
-        
-        dE=Edepfunc(d, Materials[0], BB, beta, Flx, Tsrc+textra, Porosity)
-        if dE<1.e-10:
-            depflag=0
-            break
-        vol=2.*math.pi*(((TRad*100.-(d-Depthres))**3)-((TRad*100.-(d+Depthres))**3))*(math.cos(theta0)-math.cos(theta1))/3.0
-        Esum=Esum+dE*vol
-    if depflag==1:
-        print("totdepth (%e) not deep enough, quitting" % totdepth)
-        break
+
+def logEdep(d):
+    """log10 of the on-axis deposition, floored so the root at 1e-80 brackets."""
+    return math.log10(max(edepM(d, beta, Flx, Tsrc, Porosity), 1.e-300)) + 80.0
+
+# root of log10(dE) + 80, i.e. the depth where dE falls to 1e-80; replaces
+# the old grow-by-1.5x scan, which overshot and called Edepfunc far more often
+totdepth = scipy.optimize.brentq(logEdep, Depthres, 1.e6)
+
+def logEdepFlx(logFlx):
+    """log10 of the shallowest-zone deposition as a function of log10 fluence."""
+    return math.log10(max(edepM(Depthres, 1.0, 10.0**logFlx, Tsrc, Porosity), 1.e-300)) + 80.0
+
+# fluence below which even the shallowest zone deposits less than 1e-80;
+# quadrature nodes out in the fluence tail then skip the fit stack entirely
+FLX_MIN = 10.0**scipy.optimize.brentq(logEdepFlx, -120.0, math.log10(Flx))
+
+# the integrand closes over totdepth and FLX_MIN, so build it only now
+# that both bounds are known
+EdepIntegrand = make_cubature_integrand(edepM, totdepth, FLX_MIN)
+
+if UseTable:
+    # The deposition is not smooth in z - test_dist has a hard cutoff
+    # step and a sharp semicircle/tail junction, and both move with the
+    # fluence - so interpolating dE itself is O(1) wrong near those
+    # features.  For fixed (Tsrc, Porosity), though, the seven fit
+    # parameters depend on (beta, Flx) only through y = log10 of the
+    # angle-scaled fluence.  Tabulate them on one dense 1-D grid in y and
+    # keep anglefunc, the edge scaling and test_dist itself exact: the
+    # only approximation left is linear interpolation of seven smooth 1-D
+    # functions.  Below y = -4 the profile is pinned and only EdgeScale
+    # varies, so the grid starts there.
+    y_tab = np.linspace(-4.0, math.log10(Yield/(4*math.pi*(HOB**2))) + 0.5, 4096)
+
+    @njit(fastmath=True)
+    def _fill_partable(y_tab, Tsrc, Porosity, pars):
+        """Tabulate (scale, xscale, yscale, exfrac, square, b, cutoff) over y."""
+        tab = np.zeros((y_tab.size, 7))
+        xpar, ypar, expar, sqpar, bpar, cutpar, scalepar, anglepar = pars
+        x = Tsrc*0.1   # convert ns to sh
+        for i in range(y_tab.size):
+            sc, xs, ys, exf, sq, bv, cut = eval_pars(x, y_tab[i], Porosity, xpar, ypar, expar, sqpar, bpar, cutpar, scalepar)
+            tab[i, 0] = sc; tab[i, 1] = xs; tab[i, 2] = ys; tab[i, 3] = exf
+            tab[i, 4] = sq; tab[i, 5] = bv; tab[i, 6] = cut
+        return tab
+
+    ParTable = _fill_partable(y_tab, Tsrc, Porosity, PARAMS[(Materials[0], BB)])
+    anglepar_run = PARAMS[(Materials[0], BB)][7]
+
+    # no cache=True: the closure captures the table arrays, which numba
+    # cannot cache to disk (it would warn and compile every run anyway)
+    @njit(fastmath=True)
+    def edep_table_point(z, beta, Flx, Tsrc, Porosity):
+        """Same signature as the specialized deposition function; the seven
+        fit parameters come from the 1-D table, everything else is exact."""
+        if Flx <= 0.0 or beta <= 0.0:
+            return 0.0
+        ts = Tsrc*0.1   # convert ns to sh
+        sFlx = Flx*anglefunc(beta, math.log10(Flx), ts, anglepar_run)
+        if sFlx <= 0.0:
+            return 0.0
+        EdgeScale = 1.0
+        if sFlx < 1.0e-4:
+            EdgeScale = sFlx*1.0e4
+            y = -4.0
+        else:
+            y = math.log10(sFlx)
+
+        ny = y_tab.shape[0]
+        fy = (y - y_tab[0])/(y_tab[1] - y_tab[0])
+        fy = min(max(fy, 0.0), ny - 1.0)
+        i = min(int(fy), ny - 2)
+        w = fy - i
+        scale = ParTable[i, 0]*(1.0 - w) + ParTable[i+1, 0]*w
+        xs    = ParTable[i, 1]*(1.0 - w) + ParTable[i+1, 1]*w
+        ys    = ParTable[i, 2]*(1.0 - w) + ParTable[i+1, 2]*w
+        exf   = ParTable[i, 3]*(1.0 - w) + ParTable[i+1, 3]*w
+        sq    = ParTable[i, 4]*(1.0 - w) + ParTable[i+1, 4]*w
+        bv    = ParTable[i, 5]*(1.0 - w) + ParTable[i+1, 5]*w
+        cut   = ParTable[i, 6]*(1.0 - w) + ParTable[i+1, 6]*w
+        # expt stays pinned at 1e4 here, so the cutoff drop is the exact step
+        return 10.0*test_dist(z*(1-Porosity), scale, xs, ys, exf, sq, bv, cut, 1.0e4)*(1-Porosity)*EdgeScale # convert jerk/cm^3 to Perg/cm^3
+
+    EdepIntegrand = make_cubature_integrand(edep_table_point, totdepth, FLX_MIN)
+
+print("Starting integral.")
+
+# one genuinely 2-D adaptive cubature over the (s, theta) rectangle keeps a
+# single global tolerance instead of nesting 1-D quadratures, and every
+# batch of points runs through the compiled integrand at once
+EsumInt = scipy.integrate.cubature(EdepIntegrand, [0.0, 0.0], [1.0, theta_max])
+print("Integrated deposited energy:    ", EsumInt.estimate/4.184e4, "kt  +- ", EsumInt.error/4.184e4, " kt")
+
+# zone-centered depth grid and the theta-independent part of the zone
+# volumes, computed once; each angle only contributes the cos(theta) factor
+d_arr   = np.arange(Depthres, totdepth, 2.0*Depthres)
+vol_arr = 2.*math.pi*(((TRad*100. - (d_arr - Depthres))**3) - ((TRad*100. - (d_arr + Depthres))**3))/3.0
+
+Esum, nshallow = EdepSweep(d_arr, vol_arr, AngRes, theta_max, Yield, Tsrc, Porosity, TRad, HOB)
+if nshallow > 0:
+    print("totdepth (%e) not deep enough for %d angles" % (totdepth, nshallow))
 
 print("Zone-centered deposited energy: ", Esum/4.184e4,"kt") 
 